@@ -0,0 +1,50 @@
+import sys
+import timeit
+
+import libcst as cst
+
+from transformers.patterns import Arg, Call, Name, RuleSet
+
+
+def collect(module: cst.Module):
+    nodes = []
+
+    class Collector(cst.CSTVisitor):
+        def on_visit(self, node: cst.CSTNode) -> bool:
+            nodes.append(node)
+            return True
+
+    module.visit(Collector())
+    return nodes
+
+
+def make_rules(count: int) -> RuleSet:
+    rules = RuleSet()
+    for i in range(count):
+        rules.register(Call(Name(f"f{i}"), args=[Arg(cst.ListComp)]), lambda n: n)
+    return rules
+
+
+def linear(rules: RuleSet, node: cst.CSTNode) -> cst.CSTNode:
+    for rule in rules.rules:
+        if rule.pattern.match(node):
+            return rule.rewrite(node)
+    return node
+
+
+if __name__ == "__main__":
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    source = "".join(f"f{i % 50}([x for x in d])\n" for i in range(calls))
+    nodes = collect(cst.parse_module(source))
+    print(f"{len(nodes)} nodes, ns per node")
+    print(f"{'rules':>6} {'table':>10} {'linear':>10}")
+    for count in (1, 10, 50, 100, 500):
+        rules = make_rules(count)
+        table = min(
+            timeit.repeat(lambda: [rules.apply(n) for n in nodes], number=5, repeat=3)
+        )
+        scan = min(
+            timeit.repeat(lambda: [linear(rules, n) for n in nodes], number=5, repeat=3)
+        )
+        per_node = 1e9 / (5 * len(nodes))
+        print(f"{count:>6} {table * per_node:>10.0f} {scan * per_node:>10.0f}")
@@ -0,0 +1,192 @@
+import configparser
+import os
+from fnmatch import fnmatch
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+try:
+    import tomllib
+except ImportError:
+    try:
+        import toml as tomllib  # type: ignore
+    except ImportError:
+        tomllib = None  # type: ignore
+
+RULES: Tuple[str, ...] = ("comprehensions", "asserts", "annotations")
+GENERATED_MARKERS: Tuple[str, ...] = ("@generated",)
+
+
+def _split(value: str) -> List[str]:
+    return [v.strip() for v in value.replace("\n", ",").split(",") if v.strip()]
+
+
+def _parse_per_file(value: str) -> Dict[str, List[str]]:
+    result: Dict[str, List[str]] = {}
+    for line in value.splitlines():
+        if not line.strip():
+            continue
+        pattern, _, rules = line.partition(":")
+        result[pattern.strip()] = _split(rules)
+    return result
+
+
+def _check_rules(rules: Iterable[str]) -> List[str]:
+    rules = list(rules)
+    for rule in rules:
+        if rule not in RULES:
+            raise ValueError(f"Unknown rule {rule!r}, expected one of {RULES}.")
+    return rules
+
+
+def _rule_list(value, key: str) -> Optional[List[str]]:
+    if value is not None and not (
+        isinstance(value, list) and all(isinstance(v, str) for v in value)
+    ):
+        raise ValueError(f"{key} must be a list of rule names, got {value!r}.")
+    return value
+
+
+def _rule_table(value, key: str) -> Optional[Dict[str, List[str]]]:
+    if value is None:
+        return None
+    if not isinstance(value, dict):
+        raise ValueError(f"{key} must be a table of glob = [rules], got {value!r}.")
+    for pattern, rules in value.items():
+        _rule_list(rules, f'{key}."{pattern}"')
+    return value
+
+
+def _limits(section) -> dict:
+    keys = ("timeout", "max-file-size", "max-line-length", "generated-markers")
+    return {k.replace("-", "_"): section[k] for k in keys if k in section}
+
+
+class Config:
+    root: str
+    select: List[str]
+    ignore: List[str]
+    per_file_select: Dict[str, List[str]]
+    per_file_ignores: Dict[str, List[str]]
+    timeout: float
+    max_file_size: int
+    max_line_length: int
+    generated_markers: List[str]
+    cli_select: Optional[List[str]]
+    cli_ignore: List[str]
+
+    def __init__(
+        self,
+        root: str = ".",
+        select: Optional[Iterable[str]] = None,
+        ignore: Optional[Iterable[str]] = None,
+        per_file_select: Optional[Dict[str, List[str]]] = None,
+        per_file_ignores: Optional[Dict[str, List[str]]] = None,
+        timeout: float = 0.0,
+        max_file_size: int = 1024 * 1024,
+        max_line_length: int = 1000,
+        generated_markers: Optional[Iterable[str]] = None,
+    ):
+        self.root = root
+        self.select = _check_rules(RULES if select is None else select)
+        self.ignore = _check_rules(ignore or [])
+        self.per_file_select = {
+            k: _check_rules(v) for k, v in (per_file_select or {}).items()
+        }
+        self.per_file_ignores = {
+            k: _check_rules(v) for k, v in (per_file_ignores or {}).items()
+        }
+        self.timeout = float(timeout)
+        self.max_file_size = int(max_file_size)
+        self.max_line_length = int(max_line_length)
+        self.generated_markers = list(
+            GENERATED_MARKERS if generated_markers is None else generated_markers
+        )
+        self.cli_select = None
+        self.cli_ignore = []
+
+    def override(self, select: Optional[str] = None, ignore: Optional[str] = None):
+        if select is not None:
+            self.cli_select = _check_rules(_split(select))
+        if ignore is not None:
+            self.cli_ignore = _check_rules(_split(ignore))
+
+    def _matches(self, fname: str, pattern: str) -> bool:
+        path = os.path.relpath(os.path.abspath(fname), self.root)
+        path = path.replace(os.sep, "/")
+        return fnmatch(path, pattern) or fnmatch(os.path.basename(path), pattern)
+
+    def rules_for(self, fname: str) -> FrozenSet[str]:
+        if self.cli_select is not None:
+            rules = set(self.cli_select)
+        else:
+            rules = set(self.select) - set(self.ignore)
+            for pattern, selected in self.per_file_select.items():
+                if self._matches(fname, pattern):
+                    rules.update(selected)
+            for pattern, ignored in self.per_file_ignores.items():
+                if self._matches(fname, pattern):
+                    rules.difference_update(ignored)
+        return frozenset(rules - set(self.cli_ignore))
+
+    @staticmethod
+    def _from_pyproject(path: str) -> Optional["Config"]:
+        if tomllib is None:
+            raise ImportError(
+                f"Can't read {path}: install toml or use Python 3.11+ (tomllib)."
+            )
+        with open(path, "rb") as f:
+            data = tomllib.loads(f.read().decode("utf-8"))
+        section = data.get("tool", {}).get("pyfixer")
+        if section is None:
+            return None
+        return Config(
+            root=os.path.dirname(path),
+            select=_rule_list(section.get("select"), "select"),
+            ignore=_rule_list(section.get("ignore"), "ignore"),
+            per_file_select=_rule_table(
+                section.get("per-file-select"), "per-file-select"
+            ),
+            per_file_ignores=_rule_table(
+                section.get("per-file-ignores"), "per-file-ignores"
+            ),
+            **_limits(section),
+        )
+
+    @staticmethod
+    def _from_setup_cfg(path: str) -> Optional["Config"]:
+        parser = configparser.ConfigParser()
+        parser.read(path)
+        if not parser.has_section("pyfixer"):
+            return None
+        section = parser["pyfixer"]
+        return Config(
+            root=os.path.dirname(path),
+            select=_split(section["select"]) if "select" in section else None,
+            ignore=_split(section.get("ignore", "")),
+            per_file_select=_parse_per_file(section.get("per-file-select", "")),
+            per_file_ignores=_parse_per_file(section.get("per-file-ignores", "")),
+            **_limits(
+                {
+                    k: _split(v) if k == "generated-markers" else v
+                    for k, v in section.items()
+                }
+            ),
+        )
+
+    @staticmethod
+    def find(start: str = ".") -> "Config":
+        directory = os.path.abspath(start)
+        while True:
+            pyproject = os.path.join(directory, "pyproject.toml")
+            if os.path.isfile(pyproject):
+                config = Config._from_pyproject(pyproject)
+                if config is not None:
+                    return config
+            setup_cfg = os.path.join(directory, "setup.cfg")
+            if os.path.isfile(setup_cfg):
+                config = Config._from_setup_cfg(setup_cfg)
+                if config is not None:
+                    return config
+            parent = os.path.dirname(directory)
+            if parent == directory:
+                return Config(root=os.path.abspath(start))
+            directory = parent
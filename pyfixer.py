@@ -1,34 +1,277 @@
+import argparse
 import difflib
+import mmap
+import os
+import re
+import stat
 import sys
+import tempfile
+from collections import deque, namedtuple
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import wait
+from time import monotonic
+from typing import Dict, List, Optional
 
 import libcst as cst
 
+from config import RULES, Config
 from transformers.annotations import AnnotationsTransformer
 from transformers.asserts import AssertsTransformer
 from transformers.comprehension import ComprehensionsTransformer
 
 INPLACE = True
+MMAP_THRESHOLD = 64 * 1024
+HEADER_SIZE = 4096
 
-if __name__ == "__main__":
-    fname = sys.argv[1]
-    print(fname)
-    with open(fname, "r") as f:
-        source_text = f.read()
-    source_tree = cst.parse_module(source_text)
-    modified_tree = source_tree.visit(ComprehensionsTransformer())
-    modified_tree = modified_tree.visit(AssertsTransformer())
-    modified_tree = modified_tree.visit(AnnotationsTransformer())
-    result_text = modified_tree.code
-    if source_text != result_text:
-        if INPLACE:
-            with open(fname, "w") as f:
-                f.write(result_text)
-        else:
-            print(
-                "".join(
-                    difflib.unified_diff(
-                        source_text.splitlines(1), result_text.splitlines(1)
+EXIT_OK = 0
+EXIT_CHANGED = 1
+EXIT_FAILED = 3
+
+TRANSFORMERS = {
+    "comprehensions": ComprehensionsTransformer,
+    "asserts": AssertsTransformer,
+    "annotations": AnnotationsTransformer,
+}
+
+Result = namedtuple("Result", ["fname", "status", "reason", "diff"])
+
+
+def _skip_reason(config: Config, source) -> str:
+    comments = [
+        line
+        for line in source[:HEADER_SIZE].splitlines()
+        if line.lstrip().startswith(b"#")
+    ]
+    for marker in config.generated_markers:
+        if any(marker.encode("utf-8") in line for line in comments):
+            return f"generated ({marker})"
+    if config.max_line_length:
+        too_long = re.compile(rb"[^\r\n]{%d}" % (config.max_line_length + 1))
+        if too_long.search(source):
+            return f"line length > {config.max_line_length}"
+    return ""
+
+
+def _read(config: Config, fname: str, size: int):
+    with open(fname, "rb") as f:
+        if size < MMAP_THRESHOLD:
+            source_bytes = f.read()
+            return _skip_reason(config, source_bytes), source_bytes
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            reason = _skip_reason(config, mapped)
+            return reason, None if reason else mapped[:]
+
+
+def _write(fname: str, data: bytes) -> None:
+    """Replace fname atomically so a killed worker never leaves it half written."""
+    fd, tmp = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(fname)),
+        prefix=f".{os.path.basename(fname)}.",
+        suffix=".pyfixer",
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp, stat.S_IMODE(os.stat(fname).st_mode))
+        os.replace(tmp, fname)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _transform(source_bytes: bytes, passes) -> cst.Module:
+    modified_tree = cst.parse_module(source_bytes)
+    for name in passes:
+        modified_tree = modified_tree.visit(TRANSFORMERS[name]())
+    return modified_tree
+
+
+def fix_file(config: Config, fname: str) -> Result:
+    rules = config.rules_for(fname)
+    passes = [name for name in RULES if name in rules]
+    if not passes:
+        return Result(fname, "skipped", "no rules enabled", None)
+    size = os.path.getsize(fname)
+    if config.max_file_size and size > config.max_file_size:
+        return Result(fname, "skipped", f"size {size} > {config.max_file_size}", None)
+    reason, source_bytes = _read(config, fname, size)
+    if reason:
+        return Result(fname, "skipped", reason, None)
+    modified_tree = _transform(source_bytes, passes)
+    result_bytes = modified_tree.bytes
+    if source_bytes == result_bytes:
+        return Result(fname, "unchanged", "", None)
+    if INPLACE:
+        _write(fname, result_bytes)
+        return Result(fname, "changed", "", None)
+    encoding = modified_tree.encoding
+    diff = "".join(
+        difflib.unified_diff(
+            source_bytes.decode(encoding).splitlines(1),
+            result_bytes.decode(encoding).splitlines(1),
+        )
+    )
+    return Result(fname, "changed", "", diff)
+
+
+def process_file(config: Config, fname: str) -> Result:
+    try:
+        return fix_file(config, fname)
+    except Exception as e:
+        message = str(e).strip().splitlines()
+        reason = f"{type(e).__name__}: {message[0]}" if message else type(e).__name__
+        return Result(fname, "error", reason, None)
+
+
+def _worker(conn) -> None:
+    while True:
+        task = conn.recv()
+        if task is None:
+            return
+        conn.send(process_file(*task))
+
+
+class Worker:
+    index: Optional[int]
+    deadline: Optional[float]
+
+    def __init__(self):
+        self.conn, child = Pipe()
+        self.process = Process(target=_worker, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+        self.index = None
+        self.deadline = None
+
+    def submit(self, index: int, config: Config, fname: str) -> None:
+        self.index = index
+        self.deadline = monotonic() + config.timeout if config.timeout > 0 else None
+        self.conn.send((config, fname))
+
+    def close(self) -> None:
+        self.conn.send(None)
+        self.process.join()
+
+    def kill(self) -> None:
+        self.process.terminate()
+        self.process.join()
+        self.conn.close()
+
+
+def run(tasks, jobs: int) -> List[Result]:
+    """Process tasks in worker processes, killing a worker once its file times out."""
+    pending = deque(enumerate(tasks))
+    results: Dict[int, Result] = {}
+    idle = [Worker() for _ in range(max(1, min(jobs, len(tasks))))]
+    busy: List[Worker] = []
+    while pending or busy:
+        while idle and pending:
+            index, (config, fname) = pending.popleft()
+            worker = idle.pop()
+            worker.submit(index, config, fname)
+            busy.append(worker)
+        deadlines = [w.deadline for w in busy if w.deadline is not None]
+        timeout = max(0.0, min(deadlines) - monotonic()) if deadlines else None
+        ready = wait([w.conn for w in busy], timeout)
+        now = monotonic()
+        for worker in list(busy):
+            config, fname = tasks[worker.index]
+            if worker.conn in ready:
+                try:
+                    results[worker.index] = worker.conn.recv()
+                except EOFError:
+                    results[worker.index] = Result(
+                        fname, "error", "worker process died", None
                     )
+                    worker.kill()
+                    if pending:
+                        idle.append(Worker())
+                else:
+                    idle.append(worker)
+            elif worker.deadline is not None and now >= worker.deadline:
+                results[worker.index] = Result(
+                    fname, "timeout", f"exceeded {config.timeout}s", None
                 )
-            )
-        sys.exit(1)
+                worker.kill()
+                if pending:
+                    idle.append(Worker())
+            else:
+                continue
+            busy.remove(worker)
+    for worker in idle:
+        worker.close()
+    return [results[index] for index in range(len(tasks))]
+
+
+def report(results) -> None:
+    sections = [
+        ("Skipped files:", "skipped"),
+        ("Timed out files:", "timeout"),
+        ("Failed files:", "error"),
+    ]
+    for title, status in sections:
+        matching = [r for r in results if r.status == status]
+        if matching:
+            print(title, file=sys.stderr)
+            for r in matching:
+                print(f"  {r.fname}: {r.reason}", file=sys.stderr)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="pyfixer",
+        epilog=f"exit status: {EXIT_OK} nothing to fix, {EXIT_CHANGED} files were "
+        f"fixed, {EXIT_FAILED} some files failed or timed out",
+    )
+    parser.add_argument("files", nargs="+")
+    parser.add_argument(
+        "--select",
+        help=f"comma separated rules to enable, overrides config ({','.join(RULES)})",
+    )
+    parser.add_argument(
+        "--ignore", help="comma separated rules to disable, overrides config"
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        help="per file time budget in seconds; files then run in worker processes "
+        "that are killed when they exceed it (default: 0, no budget)",
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=1, help="number of worker processes"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv) -> int:
+    args = parse_args(argv)
+    configs: Dict[str, Config] = {}
+    tasks = []
+    for fname in args.files:
+        directory = os.path.dirname(os.path.abspath(fname))
+        if directory not in configs:
+            config = Config.find(directory)
+            config.override(select=args.select, ignore=args.ignore)
+            if args.timeout is not None:
+                config.timeout = args.timeout
+            configs[directory] = config
+        tasks.append((configs[directory], fname))
+    if args.jobs > 1 or any(config.timeout > 0 for config, _ in tasks):
+        results = run(tasks, args.jobs)
+    else:
+        results = [process_file(*task) for task in tasks]
+    for result in results:
+        if result.status in ("changed", "unchanged"):
+            print(result.fname)
+        if result.diff:
+            print(result.diff)
+    report(results)
+    if any(r.status in ("error", "timeout") for r in results):
+        return EXIT_FAILED
+    if any(r.status == "changed" for r in results):
+        return EXIT_CHANGED
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
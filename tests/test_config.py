@@ -0,0 +1,117 @@
+import os
+import tempfile
+import textwrap
+import unittest
+
+from config import Config
+
+
+def write(directory: str, name: str, content: str) -> str:
+    path = os.path.join(directory, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(textwrap.dedent(content))
+    return path
+
+
+class TestConfig(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_defaults(self):
+        config = Config.find(self.root)
+        assert config.rules_for(os.path.join(self.root, "a.py")) == {
+            "comprehensions",
+            "asserts",
+            "annotations",
+        }
+
+    def test_setup_cfg(self):
+        write(
+            self.root,
+            "setup.cfg",
+            """
+            [pyfixer]
+            select = comprehensions, annotations
+            ignore = annotations
+            per-file-select =
+                tests/*: asserts
+            per-file-ignores =
+                legacy/*: comprehensions
+            timeout = 2.5
+            generated-markers = @generated, DO NOT EDIT
+            """,
+        )
+        config = Config.find(os.path.join(self.root, "tests"))
+        assert config.rules_for(os.path.join(self.root, "lib.py")) == {"comprehensions"}
+        assert config.rules_for(os.path.join(self.root, "tests", "test_a.py")) == {
+            "comprehensions",
+            "asserts",
+        }
+        assert config.rules_for(os.path.join(self.root, "legacy", "a.py")) == set()
+        assert config.timeout == 2.5
+        assert config.generated_markers == ["@generated", "DO NOT EDIT"]
+
+    def test_pyproject(self):
+        write(
+            self.root,
+            "pyproject.toml",
+            """
+            [tool.pyfixer]
+            select = ["comprehensions"]
+            max-line-length = 200
+
+            [tool.pyfixer.per-file-select]
+            "test_*.py" = ["asserts"]
+            """,
+        )
+        write(self.root, "setup.cfg", "[pyfixer]\nselect = annotations\n")
+        config = Config.find(os.path.join(self.root, "pkg", "sub"))
+        assert config.rules_for(os.path.join(self.root, "pkg", "test_a.py")) == {
+            "comprehensions",
+            "asserts",
+        }
+        assert config.max_line_length == 200
+
+    def test_pyproject_types(self):
+        invalid = [
+            ("select", 'select = "asserts"'),
+            ("ignore", "ignore = [1]"),
+            ("per-file-select", 'per-file-select = ["asserts"]'),
+            (
+                'per-file-ignores."tests/\\*"',
+                '[tool.pyfixer.per-file-ignores]\n"tests/*" = "asserts"',
+            ),
+        ]
+        for key, body in invalid:
+            write(self.root, "pyproject.toml", f"[tool.pyfixer]\n{body}\n")
+            with self.assertRaisesRegex(ValueError, f"^{key} must be"):
+                Config.find(self.root)
+
+    def test_pyproject_without_section(self):
+        write(self.root, "pyproject.toml", "[tool.other]\nx = 1\n")
+        write(self.root, "setup.cfg", "[pyfixer]\nselect = annotations\n")
+        config = Config.find(self.root)
+        assert config.rules_for(os.path.join(self.root, "a.py")) == {"annotations"}
+
+    def test_cli_overrides_per_file_tables(self):
+        config = Config(
+            root=self.root,
+            select=["comprehensions"],
+            per_file_select={"tests/*": ["asserts"]},
+        )
+        fname = os.path.join(self.root, "tests", "test_x.py")
+        config.override(ignore="asserts,comprehensions")
+        assert config.rules_for(fname) == set()
+        config.override(select="annotations,asserts")
+        assert config.rules_for(fname) == {"annotations"}
+
+    def test_unknown_rule(self):
+        with self.assertRaises(ValueError):
+            Config(select=["bogus"])
+        with self.assertRaises(ValueError):
+            Config().override(ignore="bogus")
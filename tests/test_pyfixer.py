@@ -0,0 +1,147 @@
+import contextlib
+import io
+import multiprocessing
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import pyfixer
+from config import Config
+
+
+class TestPyfixer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.config = Config(root=self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name: str, content: bytes) -> str:
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "wb") as f:
+            f.write(content)
+        return path
+
+    def read(self, path: str) -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
+
+    def test_skip(self):
+        generated = self.write("generated.py", b"# @generated\nx == 1\n")
+        mentioned = self.write("mentioned.py", b'MARKER = "@generated"\nx == 1\n')
+        late = self.write("late.py", b"x == 1\n" * 1000 + b"# @generated\n")
+        long_line = self.write("long.py", b"x == 1  # " + b"-" * 2000 + b"\n")
+        big = self.write("big.py", b"x == 1\n" * 1000)
+        self.config.max_file_size = 5000
+        result = pyfixer.process_file(self.config, generated)
+        assert (result.status, result.reason) == ("skipped", "generated (@generated)")
+        assert pyfixer.process_file(self.config, mentioned).status == "changed"
+        assert pyfixer.process_file(self.config, late).status == "skipped"
+        self.config.max_file_size = 1024 * 1024
+        assert pyfixer.process_file(self.config, late).status == "changed"
+        result = pyfixer.process_file(self.config, long_line)
+        assert (result.status, result.reason) == ("skipped", "line length > 1000")
+        self.config.max_file_size = 1000
+        result = pyfixer.process_file(self.config, big)
+        assert (result.status, result.reason) == ("skipped", "size 7000 > 1000")
+        assert self.read(big) == b"x == 1\n" * 1000
+
+    def test_round_trip(self):
+        cases = {
+            "crlf.py": (b"x = list([1])\r\ny = 2\r\n", b"x = [1]\r\ny = 2\r\n"),
+            "latin1.py": (
+                b"# -*- coding: latin-1 -*-\nx = '\xe9'\ny = list([1])\n",
+                b"# -*- coding: latin-1 -*-\nx = '\xe9'\ny = [1]\n",
+            ),
+            "bom.py": (
+                b"\xef\xbb\xbfx = '\xc3\xa9'\r\ny = list([1])\r\n",
+                b"\xef\xbb\xbfx = '\xc3\xa9'\r\ny = [1]\r\n",
+            ),
+            "mapped.py": (
+                b"x = 1\r\n" * 11000 + b"y = list([1])\r\n",
+                b"x = 1\r\n" * 11000 + b"y = [1]\r\n",
+            ),
+        }
+        for name, (source, expected) in cases.items():
+            path = self.write(name, source)
+            assert pyfixer.process_file(self.config, path).status == "changed", name
+            assert self.read(path) == expected, name
+            assert pyfixer.process_file(self.config, path).status == "unchanged", name
+            assert self.read(path) == expected, name
+
+    def test_diff(self):
+        path = self.write("a.py", b"# coding: latin-1\nx = list(['\xe9'])\n")
+        pyfixer.INPLACE = False
+        try:
+            result = pyfixer.process_file(self.config, path)
+        finally:
+            pyfixer.INPLACE = True
+        assert result.status == "changed"
+        assert "-x = list(['\xe9'])\n+x = ['\xe9']\n" in result.diff
+        assert self.read(path) == b"# coding: latin-1\nx = list(['\xe9'])\n"
+
+    def test_write_keeps_mode(self):
+        path = self.write("a.py", b"x == 1\n")
+        os.chmod(path, 0o754)
+        assert pyfixer.process_file(self.config, path).status == "changed"
+        assert os.stat(path).st_mode & 0o777 == 0o754
+        assert os.listdir(self.tmp.name) == ["a.py"]
+
+    @unittest.skipUnless(
+        multiprocessing.get_start_method() == "fork", "needs fork to patch workers"
+    )
+    def test_kill_during_write(self):
+        path = self.write("a.py", b"x == 1\n")
+        self.config.timeout = 0.5
+        with mock.patch.object(pyfixer.os, "replace", lambda *args: time.sleep(60)):
+            results = pyfixer.run([(self.config, path)], 1)
+        assert results[0].status == "timeout"
+        assert self.read(path) == b"x == 1\n"
+
+    def test_error(self):
+        bad = self.write("bad.py", b"def (:\n")
+        result = pyfixer.process_file(self.config, bad)
+        assert result.status == "error"
+        assert result.reason.startswith("ParserSyntaxError")
+
+    def test_exit_status(self):
+        good = self.write("good.py", b"x == 1\n")
+        bad = self.write("bad.py", b"def (:\n")
+        missing = os.path.join(self.tmp.name, "missing.py")
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(
+            io.StringIO()
+        ):
+            assert pyfixer.main([good]) == pyfixer.EXIT_CHANGED
+            assert pyfixer.main([good]) == pyfixer.EXIT_OK
+            for timeout in ("0", "5"):
+                for fname in (bad, missing):
+                    argv = ["--timeout", timeout, good, fname]
+                    assert pyfixer.main(argv) == pyfixer.EXIT_FAILED
+            slow = self.write("slow.py", b"x = (1\n" + b" + 1\n" * 20000 + b")\n")
+            argv = ["--timeout", "0.2", good, slow]
+            assert pyfixer.main(argv) == pyfixer.EXIT_FAILED
+
+    def test_run(self):
+        slow = self.write("slow.py", b"x = (1\n" + b" + 1\n" * 20000 + b")\n")
+        bad = self.write("bad.py", b"def (:\n")
+        good = self.write("good.py", b"x == 1\n")
+        self.config.max_file_size = 10 * 1024 * 1024
+        self.config.timeout = 0.2
+        tasks = [(self.config, slow), (self.config, bad), (self.config, good)]
+        for jobs in (1, 2):
+            self.write("good.py", b"x == 1\n")
+            results = pyfixer.run(tasks, jobs)
+            assert [r.status for r in results] == ["timeout", "error", "changed"]
+            assert self.read(good) == b"assert x == 1\n"
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            pyfixer.report(results)
+        assert stderr.getvalue() == (
+            "Timed out files:\n"
+            f"  {slow}: exceeded 0.2s\n"
+            "Failed files:\n"
+            f"  {bad}: {results[1].reason}\n"
+        )
@@ -1,156 +1,122 @@
-from typing import List, Tuple, Union
-
 import libcst as cst
 
+from transformers.patterns import ANY, P, Arg, Call, Name, RuleSet, RuleTransformer
 
-class ComprehensionsTransformer(cst.CSTTransformer):
-    GEN_BUILTINS = [
-        "all",
-        "any",
-        "enumerate",
-        "frozenset",
-        "max",
-        "min",
-        "sorted",
-        "sum",
-        "tuple",
-    ]
-
-    def __init__(self):
-        self.stack: List[Tuple[str, ...]] = []
-
-    def _list_call(self, node: cst.Call) -> Union[cst.Call, cst.List, cst.ListComp]:
-        if not node.args:
-            return cst.List(elements=[])
-        if len(node.args) != 1:
-            return node
-        value = node.args[0].value
-        if isinstance(value, cst.ListComp):
-            return value
-        if isinstance(value, cst.GeneratorExp):
-            return cst.ListComp(elt=value.elt, for_in=value.for_in)
-        if isinstance(value, cst.List):
-            return value
-        if isinstance(value, cst.Tuple):
-            return cst.List(elements=value.elements)
-        return node
-
-    def _tuple_call(self, node: cst.Call) -> Union[cst.Call, cst.Tuple]:
-        if not node.args:
-            return cst.Tuple(elements=[])
-        if len(node.args) != 1:
-            return node
-        value = node.args[0].value
-        if isinstance(value, (cst.List, cst.Tuple)):
-            if value.elements:
-                return cst.Tuple(elements=value.elements)
-            else:
-                return cst.Tuple(elements=[])
-        return node
-
-    def _set_call(self, node: cst.Call) -> Union[cst.Call, cst.Set, cst.SetComp]:
-        if len(node.args) != 1:
-            return node
-        value = node.args[0].value
-        if isinstance(value, (cst.List, cst.Tuple)):
-            if value.elements:
-                return cst.Set(elements=value.elements)
-            else:
-                return node.with_changes(args=[])
-        if isinstance(value, (cst.ListComp, cst.SetComp, cst.GeneratorExp)):
-            return cst.SetComp(elt=value.elt, for_in=value.for_in)
-        return node
-
-    def _dict_call(self, node: cst.Call) -> Union[cst.Call, cst.Dict, cst.DictComp]:
-        if not node.args:
-            return cst.Dict(elements=[])
-        if len(node.args) != 1:
-            return node
-        value = node.args[0].value
-        if isinstance(value, cst.DictComp):
-            return value
-        if isinstance(value, (cst.ListComp, cst.GeneratorExp)):
-            elt = value.elt
-            if isinstance(elt, (cst.Tuple, cst.List)) and len(elt.elements) == 2:
-                return cst.DictComp(
-                    key=elt.elements[0].value,
-                    value=elt.elements[1].value,
-                    for_in=value.for_in,
-                )
-        if isinstance(value, (cst.Tuple, cst.List)):
-            if value.elements:
-                elements = []
-                for el in value.elements:
-                    if (
-                        isinstance(el.value, (cst.Tuple, cst.List))
-                        and len(el.value.elements) == 2
-                    ):
-                        elements.append(
-                            cst.DictElement(
-                                key=el.value.elements[0].value,
-                                value=el.value.elements[1].value,
-                            )
-                        )
-                    else:
-                        break
-                else:
-                    return cst.Dict(elements=elements)
-            else:
-                return cst.Dict(elements=[])
-        return node
-
-    def _gen_builtin_call(self, node: cst.Call) -> cst.Call:
-        if not node.args:
-            return node
-        value = node.args[0].value
-        if isinstance(value, cst.ListComp):
-            pars: dict = {"lpar": [], "rpar": []} if len(node.args) == 1 else {}
-            arg0 = node.args[0].with_changes(
-                value=cst.GeneratorExp(elt=value.elt, for_in=value.for_in, **pars)
-            )
-            return node.with_changes(args=(arg0, *node.args[1:]))
-        if isinstance(value, cst.GeneratorExp):
-            if len(node.args) == 1 and value.lpar:
-                arg0 = node.args[0].with_changes(
-                    value=cst.GeneratorExp(
-                        elt=value.elt, for_in=value.for_in, lpar=[], rpar=[]
-                    )
-                )
-                return node.with_changes(args=(arg0, *node.args[1:]))
-        return node
-
-    def leave_ComparisonTarget(self, node: cst.In, updated_node: cst.In) -> cst.In:
-        if isinstance(node.operator, cst.In) and isinstance(
-            node.comparator, cst.ListComp
-        ):
-            cmp = node.comparator
-            return updated_node.with_changes(
-                comparator=cst.GeneratorExp(elt=cmp.elt, for_in=cmp.for_in)
+GEN_BUILTINS = ["all", "any", "enumerate", "frozenset", "max", "min", "sorted", "sum"]
+
+PAIR = P((cst.Tuple, cst.List), elements=[ANY, ANY])
+LISTCOMP_ARG = Arg(cst.ListComp)
+
+
+def _nonempty(elements) -> bool:
+    return bool(elements)
+
+
+def _all_pairs(elements) -> bool:
+    return all(PAIR.match(el.value) for el in elements)
+
+
+def _listcomp_first(args) -> bool:
+    return bool(args) and LISTCOMP_ARG.match(args[0])
+
+
+def _value(node: cst.Call) -> cst.BaseExpression:
+    return node.args[0].value
+
+
+rules = RuleSet()
+
+# list
+rules.register(Call(Name("list"), args=[]), lambda node: cst.List(elements=[]))
+rules.register(Call(Name("list"), args=[Arg((cst.ListComp, cst.List))]), _value)
+rules.register(
+    Call(Name("list"), args=[Arg(cst.GeneratorExp)]),
+    lambda node: cst.ListComp(elt=_value(node).elt, for_in=_value(node).for_in),
+)
+rules.register(
+    Call(Name("list"), args=[Arg(cst.Tuple)]),
+    lambda node: cst.List(elements=_value(node).elements),
+)
+
+# tuple
+rules.register(Call(Name("tuple"), args=[]), lambda node: cst.Tuple(elements=[]))
+rules.register(
+    Call(Name("tuple"), args=[Arg((cst.List, cst.Tuple))]),
+    lambda node: cst.Tuple(elements=_value(node).elements),
+)
+
+# set
+rules.register(
+    Call(Name("set"), args=[Arg(P((cst.List, cst.Tuple), elements=_nonempty))]),
+    lambda node: cst.Set(elements=_value(node).elements),
+)
+rules.register(
+    Call(Name("set"), args=[Arg((cst.List, cst.Tuple))]),
+    lambda node: node.with_changes(args=[]),
+)
+rules.register(
+    Call(Name("set"), args=[Arg((cst.ListComp, cst.SetComp, cst.GeneratorExp))]),
+    lambda node: cst.SetComp(elt=_value(node).elt, for_in=_value(node).for_in),
+)
+
+# dict
+rules.register(Call(Name("dict"), args=[]), lambda node: cst.Dict(elements=[]))
+rules.register(Call(Name("dict"), args=[Arg(cst.DictComp)]), _value)
+rules.register(
+    Call(
+        Name("dict"),
+        args=[Arg(P((cst.ListComp, cst.GeneratorExp), elt=PAIR))],
+    ),
+    lambda node: cst.DictComp(
+        key=_value(node).elt.elements[0].value,
+        value=_value(node).elt.elements[1].value,
+        for_in=_value(node).for_in,
+    ),
+)
+rules.register(
+    Call(Name("dict"), args=[Arg(P((cst.Tuple, cst.List), elements=_all_pairs))]),
+    lambda node: cst.Dict(
+        elements=[
+            cst.DictElement(
+                key=el.value.elements[0].value, value=el.value.elements[1].value
             )
-        return updated_node
-
-    def leave_Call(
-        self, node: cst.Call, updated_node: cst.Call
-    ) -> Union[
-        cst.Call,
-        cst.ListComp,
-        cst.DictComp,
-        cst.Dict,
-        cst.SetComp,
-        cst.List,
-        cst.Tuple,
-        cst.Set,
-    ]:
-        if isinstance(node.func, cst.Call):
-            return updated_node
-        if node.func.value == "list":
-            return self._list_call(updated_node)
-        if node.func.value == "tuple":
-            return self._tuple_call(updated_node)
-        if node.func.value == "set":
-            return self._set_call(updated_node)
-        if node.func.value == "dict":
-            return self._dict_call(updated_node)
-        if node.func.value in self.GEN_BUILTINS:
-            return self._gen_builtin_call(updated_node)
-        return node
+            for el in _value(node).elements
+        ]
+    ),
+)
+
+
+def _gen_builtin_call(node: cst.Call) -> cst.Call:
+    value = _value(node)
+    pars: dict = {"lpar": [], "rpar": []} if len(node.args) == 1 else {}
+    arg0 = node.args[0].with_changes(
+        value=cst.GeneratorExp(elt=value.elt, for_in=value.for_in, **pars)
+    )
+    return node.with_changes(args=(arg0, *node.args[1:]))
+
+
+for name in GEN_BUILTINS:
+    rules.register(
+        Call(Name(name), args=_listcomp_first),
+        _gen_builtin_call,
+    )
+    rules.register(
+        Call(Name(name), args=[Arg(P(cst.GeneratorExp, lpar=_nonempty))]),
+        _gen_builtin_call,
+    )
+
+
+rules.register(
+    P(cst.ComparisonTarget, operator=cst.In, comparator=cst.ListComp),
+    lambda node: node.with_changes(
+        comparator=cst.GeneratorExp(
+            elt=node.comparator.elt, for_in=node.comparator.for_in
+        )
+    ),
+)
+
+
+class ComprehensionsTransformer(RuleTransformer):
+    GEN_BUILTINS = GEN_BUILTINS
+
+    rules = rules
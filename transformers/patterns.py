@@ -0,0 +1,131 @@
+from collections import namedtuple
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Type
+
+import libcst as cst
+
+Rule = namedtuple("Rule", ["pattern", "rewrite"])
+
+
+class P:
+    """Matches a node of `types` whose fields match the given sub-patterns.
+
+    A field pattern is another `P`, a type or tuple of types (isinstance check),
+    a list (sequence of the same length matching element-wise), a function
+    called with the field value, or a literal compared with ==.
+    """
+
+    types: Tuple[type, ...]
+    fields: Dict[str, Any]
+
+    def __init__(self, types, **fields):
+        self.types = types if isinstance(types, tuple) else (types,)
+        self.fields = fields
+
+    def match(self, node) -> bool:
+        if not isinstance(node, self.types):
+            return False
+        for name, pattern in self.fields.items():
+            if not _match(pattern, getattr(node, name)):
+                return False
+        return True
+
+    @property
+    def callee(self) -> Optional[str]:
+        func = self.fields.get("func")
+        if isinstance(func, P) and isinstance(func.fields.get("value"), str):
+            return func.fields["value"]
+        return None
+
+
+def _match(pattern, value) -> bool:
+    if isinstance(pattern, P):
+        return pattern.match(value)
+    if isinstance(pattern, (type, tuple)):
+        return isinstance(value, pattern)
+    if isinstance(pattern, list):
+        return len(pattern) == len(value) and all(
+            _match(p, v) for p, v in zip(pattern, value)
+        )
+    if callable(pattern):
+        return bool(pattern(value))
+    return pattern == value
+
+
+ANY = P(object)
+
+
+def Name(value: str) -> P:
+    return P(cst.Name, value=value)
+
+
+def Arg(value, **fields) -> P:
+    """Matches a positional argument unless `star` or `keyword` are given."""
+    return P(cst.Arg, **{"value": value, "star": "", "keyword": None, **fields})
+
+
+def Call(func, **fields) -> P:
+    return P(cst.Call, func=func, **fields)
+
+
+def _node_callee(node) -> Optional[str]:
+    if isinstance(node, cst.Call) and isinstance(node.func, cst.Name):
+        return node.func.value
+    return None
+
+
+class RuleSet:
+    """Rewrite rules compiled into a table keyed by node type and callee name.
+
+    Each node is looked up once and only tried against the rules registered
+    for its type and callee, in registration order. The first rule that
+    matches wins and its rewrite is called with the node.
+    """
+
+    rules: List[Rule]
+
+    def __init__(self):
+        self.rules = []
+        self._callees: Set[str] = set()
+        self._table: Dict[Tuple[Type, Optional[str]], List[Rule]] = {}
+
+    def register(self, pattern: P, rewrite: Optional[Callable] = None):
+        if rewrite is None:
+            return partial(self.register, pattern)
+        self.rules.append(Rule(pattern, rewrite))
+        if pattern.callee is not None:
+            self._callees.add(pattern.callee)
+        self._table.clear()
+        return rewrite
+
+    def _candidates(self, node_type: Type, callee: Optional[str]) -> List[Rule]:
+        key = (node_type, callee)
+        candidates = self._table.get(key)
+        if candidates is None:
+            candidates = [
+                rule
+                for rule in self.rules
+                if issubclass(node_type, rule.pattern.types)
+                and rule.pattern.callee in (None, callee)
+            ]
+            self._table[key] = candidates
+        return candidates
+
+    def apply(self, node: cst.CSTNode) -> cst.CSTNode:
+        callee = _node_callee(node)
+        if callee not in self._callees:
+            callee = None
+        for rule in self._candidates(type(node), callee):
+            if rule.pattern.match(node):
+                return rule.rewrite(node)
+        return node
+
+
+class RuleTransformer(cst.CSTTransformer):
+    rules: RuleSet
+
+    def on_leave(self, original_node, updated_node):
+        updated_node = super().on_leave(original_node, updated_node)
+        if isinstance(updated_node, cst.CSTNode):
+            return self.rules.apply(updated_node)
+        return updated_node
@@ -176,6 +176,36 @@ with output:
     getattr(obj, attr)(params)
 """
 
+testcase_nested = """
+with input:
+    foo(list([x for x in y]))
+    foo(bar, key=set([x for x in y]))
+    obj.method(dict([(k, v) for k, v in d]))
+with output:
+    foo([x for x in y])
+    foo(bar, key={x for x in y})
+    obj.method({k: v for k, v in d})
+"""
+
+testcase_star_and_keyword_args = """
+with input:
+    list(*[a])
+    tuple(*[a])
+    set(*[a])
+    dict(*[(1, 2)])
+    list(*(x for x in d))
+    sorted(*[x for x in d])
+    sum(x=[x for x in d])
+with output:
+    list(*[a])
+    tuple(*[a])
+    set(*[a])
+    dict(*[(1, 2)])
+    list(*(x for x in d))
+    sorted(*[x for x in d])
+    sum(x=[x for x in d])
+"""
+
 testcases = {n: v for n, v in locals().items() if n.startswith("testcase_")}
 
 
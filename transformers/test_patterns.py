@@ -0,0 +1,72 @@
+import unittest
+
+import libcst as cst
+
+from patterns import ANY, P, Arg, Call, Name, RuleSet
+
+
+def expr(code: str) -> cst.BaseExpression:
+    return cst.parse_expression(code)
+
+
+class TestPatterns(unittest.TestCase):
+    def test_match(self):
+        pattern = Call(Name("set"), args=[Arg(cst.ListComp)])
+        assert pattern.match(expr("set([x for x in d])"))
+        assert not pattern.match(expr("set(x for x in d)"))
+        assert not pattern.match(expr("set([x for x in d], 1)"))
+        assert not pattern.match(expr("list([x for x in d])"))
+        assert not pattern.match(expr("obj.set([x for x in d])"))
+        assert not pattern.match(expr("set(*[x for x in d])"))
+        assert not pattern.match(expr("set(key=[x for x in d])"))
+        assert Call(Name("f"), args=[Arg(ANY, star="*")]).match(expr("f(*a)"))
+        assert Call(Name("f"), args=[Arg(ANY, keyword=ANY)]).match(expr("f(k=a)"))
+        assert P(cst.Tuple, elements=[ANY, ANY]).match(expr("(1, 2)"))
+        assert not P(cst.Tuple, elements=[ANY, ANY]).match(expr("(1, 2, 3)"))
+        assert P(cst.Call, args=lambda args: len(args) == 1).match(expr("f(1)"))
+        assert P(cst.Call, args=lambda args: not args).match(expr("f()"))
+
+    def test_dispatch(self):
+        rules = RuleSet()
+        rules.register(Call(Name("f"), args=[]), lambda node: expr("f_empty"))
+        rules.register(Call(Name("f")), lambda node: expr("f_any"))
+        rules.register(P(cst.Call, args=[ANY]), lambda node: expr("call_one"))
+        rules.register(
+            P(cst.BaseExpression, lpar=lambda lpar: bool(lpar)),
+            lambda node: expr("par"),
+        )
+
+        @rules.register(P(cst.Name, value="x"))
+        def rename(node):
+            return node.with_changes(value="y")
+
+        assert rules.apply(expr("f()")).value == "f_empty"
+        assert rules.apply(expr("f(1, 2)")).value == "f_any"
+        assert rules.apply(expr("g(1)")).value == "call_one"
+        assert rules.apply(expr("(g)")).value == "par"
+        assert rules.apply(expr("x")).value == "y"
+        node = expr("g(1, 2)")
+        assert rules.apply(node) is node
+
+    def test_dispatch_by_callee(self):
+        calls = []
+
+        def record(name):
+            def rewrite(node):
+                calls.append(name)
+                return node
+
+            return rewrite
+
+        def never(node):
+            raise AssertionError("pattern of another callee was matched")
+
+        rules = RuleSet()
+        rules.register(P(cst.Call, func=Name("f"), args=never), record("f"))
+        rules.register(Call(Name("g")), record("g"))
+        rules.register(P(cst.Call, args=[]), record("any"))
+        rules.apply(expr("g(1)"))
+        rules.apply(expr("h()"))
+        rules.apply(expr("g()"))
+        rules.apply(expr("obj.f()"))
+        assert calls == ["g", "any", "g", "any"]